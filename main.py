@@ -14,6 +14,7 @@ Usage:
     python main.py --download-raw --upload-processed  # Full pipeline with S3
     python main.py --prepare-only                     # Run data preparation only
     python main.py --visualize-only                   # Run visualization only (requires processed data)
+    python main.py --force-prepare                    # Rerun data preparation even if raw data is unchanged
 """
 
 import argparse
@@ -39,6 +40,11 @@ def main() -> None:
         action='store_true',
         help='Only run visualization step (requires processed data)'
     )
+    parser.add_argument(
+        '--force-prepare',
+        action='store_true',
+        help='Rerun data preparation even if the raw data is unchanged'
+    )
     parser.add_argument(
         '--download-raw',
         action='store_true',
@@ -83,7 +89,7 @@ def main() -> None:
     if not args.visualize_only:
         print(f"STEP {step_num}: Data Preparation")
         print("-" * 70)
-        prepare_data(data_dir=data_dir)
+        prepare_data(data_dir=data_dir, force=args.force_prepare)
         step_num += 1
         print()
 
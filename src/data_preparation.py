@@ -1,27 +1,64 @@
 """Data preparation module for UT Austin grade distribution data."""
 import os
 import datetime
+import hashlib
+from collections.abc import Iterator
 from pathlib import Path
 
 import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+
+# Columns read from the raw grade distribution CSV
+GRADE_COLUMNS = [
+    'semester', 'course_prefix', 'course_number',
+    'department', 'letter_grade', 'num_students'
+]
+
+# Every column the processed datasets group by; raw rows are summed to this grain
+GROUP_KEYS = [
+    'semester', 'college', 'course_prefix', 'course_number', 'department',
+    'course_display_name', 'Division', 'letter_grade', 'gpa'
+]
+
+# Bytes of raw CSV parsed per chunk
+CHUNK_BYTES = 64 * 1024 * 1024
+
+# Processed datasets written by prepare_data
+PROCESSED_FILES = ['prefix_scatter_df.parquet', 'course_scatter_df.parquet', 'bar_df_by_semester.parquet']
+
+
+def hash_raw_inputs(data_dir: Path) -> str:
+    """Return a content hash of all raw CSV files."""
+    h = hashlib.blake2b()
+    for path in sorted((data_dir / 'raw').glob('*.csv')):
+        h.update(path.name.encode())
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                h.update(chunk)
+    return h.hexdigest()
+
+
+def read_grade_chunks(data_dir: Path) -> Iterator[pd.DataFrame]:
+    """Stream the raw grade distribution CSV as DataFrame chunks of about CHUNK_BYTES each."""
+    # Every column is read as a string: course numbers carry letters, student counts may contain
+    # commas, and inferring types from the first block breaks on columns that are empty there
+    reader = pa_csv.open_csv(
+        os.path.join(data_dir, 'raw', 'all_years_grade_distribution.csv'),
+        read_options=pa_csv.ReadOptions(block_size=CHUNK_BYTES),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=GRADE_COLUMNS,
+            column_types={col: pa.string() for col in GRADE_COLUMNS},
+            strings_can_be_null=True
+        )
+    )
+    for batch in reader:
+        yield batch.to_pandas()
 
 
-def load_and_engineer_data(data_dir: Path) -> tuple[pd.DataFrame, list[str]]:
-    """Load raw data and perform all feature engineering."""
-    
-    # Read in raw data and prefix to college mapping
-    df = pd.read_csv(os.path.join(data_dir, 'raw', 'all_years_grade_distribution.csv'))
-    prefix_to_college = pd.read_csv(os.path.join(data_dir, 'raw', 'prefix_to_college.csv'))
-
-    # Create prefix to college dictionary and map
-    prefix_to_college_dict = dict(zip(
-        prefix_to_college['COURSE_CODE'].tolist(),
-        prefix_to_college['COLLEGE'].tolist()
-    ))
-
-    all_colleges = set(prefix_to_college_dict.values())
-
+def engineer_chunk(df: pd.DataFrame, prefix_to_college_series: pd.Series) -> pd.DataFrame:
+    """Perform all feature engineering on a chunk of raw grade data."""
     grade_to_gpa = {
         'A+': 4.0, 'A': 4.0, 'A-': 3.67,
         'B+': 3.33, 'B': 3.0, 'B-': 2.67,
@@ -35,73 +72,149 @@ def load_and_engineer_data(data_dir: Path) -> tuple[pd.DataFrame, list[str]]:
         'ECE': 'Electrical Engineering'
     }
 
-    df = df.assign(
-        college = lambda df_: df_['course_prefix'].replace(prefix_to_college_dict),
-        num_students = lambda df_: df_['num_students'].astype(str).str.replace(',', '').astype(float),
-        section_number = lambda df_: df_['course_full_name'].str.split('no.').str[-1],
-        letter_grade = lambda df_: df_['letter_grade'].replace({'A+': 'A'}),
-        gpa = lambda df_: df_['letter_grade'].replace(grade_to_gpa),
-        semester_name = lambda df_: df_['semester'].str.split(' ').str[0],
-        semester_year = lambda df_: df_['semester'].str.split(' ').str[1].astype(int),
+    # Approximate start date of each season, in the order of season_dtype's categories
+    season_dtype = pd.CategoricalDtype(['Fall', 'Spring', 'Summer'])
+    season_months = np.array([8, 1, 6])
+    season_days = np.array([25, 20, 1])
+
+    # Split semesters like 'Fall 2021' into season and year in a single regex pass
+    semester_parts = df['semester'].str.extract(r'^(\S+)\s+(\d+)$')
+    season_codes = semester_parts[0].astype(season_dtype).cat.codes.to_numpy()
+    if (season_codes == -1).any():
+        raise ValueError(f"Unrecognized semesters: {df['semester'][season_codes == -1].unique().tolist()}")
+
+    return df.assign(
+        college = lambda df_: df_['course_prefix'].map(prefix_to_college_series).fillna('Other'),
+        num_students = lambda df_: df_['num_students'].str.replace(',', '').astype('int32'),
+        letter_grade = lambda df_: df_['letter_grade'].replace({'A+': 'A'}).astype('category'),
+        # Mapping a categorical only looks up its few categories, then takes by code
+        gpa = lambda df_: df_['letter_grade'].map(grade_to_gpa).astype('float32'),
+        semester_year = semester_parts[1].astype(int),
         course_display_name = lambda df_: df_['course_prefix'] + ' ' + df_['course_number'],
-        gpa_sum = lambda df_: df_['gpa'] * df_['num_students'],
-        course_number_int = lambda df_: df_['course_number'].str.replace(r'\D', '', regex=True).str[1:].astype(int),
-        Division = lambda df_: np.select(
-            condlist=[df_['course_number_int'] > 79, df_['course_number_int'] > 19],
-            choicelist=['Graduate', 'Upper'],
-            default='Lower'
-        ),
-        department = lambda df_: df_.apply(
-            lambda row: row['department'] if row['department'] != '' else
-            null_dept_mapping.get(row['course_prefix'], ''), axis=1
+        # Widen before multiplying so the grade point sums accumulate in float64
+        gpa_sum = lambda df_: df_['gpa'].astype('float64') * df_['num_students'],
+        course_number_int = lambda df_: df_['course_number'].str.extract(r'^\D*\d(\d+)', expand=False).astype('int32'),
+        Division = lambda df_: pd.Categorical.from_codes(
+            np.digitize(df_['course_number_int'].to_numpy(), [20, 80]),
+            categories=['Lower', 'Upper', 'Graduate']
         ),
-        month_and_day = lambda df_: np.select(
-            condlist=[df_['semester_name']=='Fall', df_['semester_name']=='Spring', df_['semester_name']=='Summer'],
-            choicelist=['-08-25', '-01-20', '-06-01'],
-            default='ERROR'
+        department = lambda df_: df_['department'].mask(
+            df_['department'] == '',
+            df_['course_prefix'].map(null_dept_mapping).fillna('')
         ),
-        date = lambda df_: pd.to_datetime(df_['semester_year'].astype(str) + df_['month_and_day'])
-    ).assign(
-        college = lambda df_: np.where(df_['college'].isin(all_colleges), df_['college'], 'Other')
+        # Build dates with datetime64 arithmetic rather than parsing strings
+        date = lambda df_: (
+            (df_['semester_year'].to_numpy() - 1970).astype('datetime64[Y]')
+            + (season_months[season_codes] - 1).astype('timedelta64[M]')
+            + (season_days[season_codes] - 1).astype('timedelta64[D]')
+        )
     )
 
-    semesters = df.sort_values('date')['semester'].unique().tolist()
+
+def load_and_engineer_data(data_dir: Path) -> tuple[pd.DataFrame, list[str]]:
+    """
+    Load raw data in chunks, engineer features, and sum num_students and gpa_sum over GROUP_KEYS.
+
+    Each chunk is reduced as soon as it is engineered, so only one chunk of row-level data is held
+    in memory at a time. The reduced frame carries everything the create_*_df aggregations need.
+    """
+    prefix_to_college = pd.read_csv(
+        os.path.join(data_dir, 'raw', 'prefix_to_college.csv'),
+        engine='pyarrow',
+        usecols=['COURSE_CODE', 'COLLEGE']
+    )
+
+    # Create prefix to college mapping; later rows win for duplicate course codes
+    prefix_to_college_series = (
+        prefix_to_college
+        .drop_duplicates('COURSE_CODE', keep='last')
+        .set_index('COURSE_CODE')['COLLEGE']
+    )
+
+    # Reduce each chunk to partial sums; keep null keys so every dataset sees all rows
+    num_rows = 0
+    partials = []
+    semester_dates = []
+    for chunk in read_grade_chunks(data_dir):
+        chunk = engineer_chunk(chunk, prefix_to_college_series)
+        num_rows += len(chunk)
+        semester_dates.append(chunk[['semester', 'date']].drop_duplicates())
+        partials.append(
+            chunk
+            .groupby(GROUP_KEYS, observed=True, dropna=False, sort=False)[['num_students', 'gpa_sum']]
+            .sum()
+            .reset_index()
+        )
+    print(f"Read {num_rows:,} rows of grade data")
+
+    # Merge the partial sums across chunks
+    df = (
+        pd.concat(partials, ignore_index=True)
+        .groupby(GROUP_KEYS, observed=True, dropna=False, sort=False)[['num_students', 'gpa_sum']]
+        .sum()
+        .reset_index()
+    )
+
+    # Order semesters chronologically by sorting only the distinct (semester, date) pairs
+    semesters = (
+        pd.concat(semester_dates)
+        .drop_duplicates()
+        .sort_values('date')['semester']
+        .tolist()
+    )
+
+    # Store groupby keys as categoricals so aggregations hash integer codes instead of strings;
+    # semester categories follow chronological order
+    for col in ('college', 'course_prefix', 'department', 'course_number', 'course_display_name', 'letter_grade', 'Division'):
+        df[col] = df[col].astype('category')
+    df['semester'] = pd.Categorical(df['semester'], categories=semesters)
 
     return df, semesters
 
 
-def create_prefix_scatter_df(df: pd.DataFrame, semesters: list[str]) -> pd.DataFrame:
-    """Create aggregated dataframe for prefix scatterplot."""
-    # Create an aggregated DF across all semesters
-    prefix_scatter_df = (
+def aggregate_by_semester(df: pd.DataFrame, keys: list[str], include_all: bool = True, **aggs) -> pd.DataFrame:
+    """
+    Aggregate over keys for each semester, plus an 'All' semester spanning every semester.
+
+    The 'All' rows are rolled up from the per-semester sums, so every aggregation must be a sum.
+    Pass include_all=False to return only the per-semester rows.
+    """
+    # Aggregate each semester in one pass; semester is a chronologically ordered categorical
+    per_semester = (
         df
-        .groupby(['college', 'course_prefix', 'department'])
-        .agg(total_students=('num_students', 'sum'), gpa_total=('gpa_sum', 'sum'))
+        .groupby(['semester'] + keys, observed=True)
+        .agg(**aggs)
         .reset_index()
-        .assign(
-            avg_gpa=lambda x: x['gpa_total'] / x['total_students'],
-            semester='All'
-        )
     )
 
-    # Create the same DF for each semester
-    semester_dfs = [
-        (
-            df
-            .query("semester == @semester")
-            .groupby(['college', 'course_prefix', 'department'])
-            .agg(total_students=('num_students', 'sum'), gpa_total=('gpa_sum', 'sum'))
-            .reset_index()
-            .assign(
-                avg_gpa=lambda x: x['gpa_total'] / x['total_students'],
-                semester=semester
-            )
-        )
-        for semester in semesters
-    ]
+    if not include_all:
+        return per_semester
+
+    # Give both frames the same semester categories so concat keeps the categorical dtype
+    semester_dtype = pd.CategoricalDtype(['All'] + per_semester['semester'].cat.categories.tolist())
+    per_semester['semester'] = per_semester['semester'].astype(semester_dtype)
 
+    # Roll the per-semester sums up across all semesters instead of rescanning df
+    overall = (
+        per_semester
+        .groupby(keys, observed=True)[list(aggs)]
+        .sum()
+        .reset_index()
+        .assign(semester='All')
+        .astype({'semester': semester_dtype})
+    )
+
+    return pd.concat([overall, per_semester], ignore_index=True)
+
+
+def create_prefix_scatter_df(df: pd.DataFrame, semesters: list[str]) -> pd.DataFrame:
+    """Create aggregated dataframe for prefix scatterplot."""
     prefix_scatter_df = (
-        pd.concat([prefix_scatter_df] + semester_dfs)
+        aggregate_by_semester(
+            df, ['college', 'course_prefix', 'department'],
+            total_students=('num_students', 'sum'), gpa_total=('gpa_sum', 'sum')
+        )
+        .assign(avg_gpa=lambda x: x['gpa_total'] / x['total_students'])
         .rename(columns={
             'course_prefix': 'Course Prefix',
             'department': 'Department',
@@ -117,36 +230,13 @@ def create_prefix_scatter_df(df: pd.DataFrame, semesters: list[str]) -> pd.DataF
 
 def create_course_scatter_df(df: pd.DataFrame, semesters: list[str]) -> pd.DataFrame:
     """Create aggregated dataframe for course scatterplot."""
-    # Create an aggregated DF across all semesters
     course_scatter_df = (
-        df
-        .groupby(['college', 'course_prefix', 'course_number', 'department', 'course_display_name', 'Division'])
-        .agg(total_students=('num_students', 'sum'), gpa_total=('gpa_sum', 'sum'))
-        .reset_index()
-        .assign(
-            avg_gpa=lambda x: x['gpa_total'] / x['total_students'],
-            semester='All'
-        )
-    )
-
-    # Create the same DF for each semester
-    semester_dfs = [
-        (
-            df
-            .query("semester == @semester")
-            .groupby(['college', 'course_prefix', 'course_number', 'department', 'course_display_name', 'Division'])
-            .agg(total_students=('num_students', 'sum'), gpa_total=('gpa_sum', 'sum'))
-            .reset_index()
-            .assign(
-                avg_gpa=lambda x: x['gpa_total'] / x['total_students'],
-                semester=semester
-            )
+        aggregate_by_semester(
+            df,
+            ['college', 'course_prefix', 'course_number', 'department', 'course_display_name', 'Division'],
+            total_students=('num_students', 'sum'), gpa_total=('gpa_sum', 'sum')
         )
-        for semester in semesters
-    ]
-
-    course_scatter_df = (
-        pd.concat([course_scatter_df] + semester_dfs)
+        .assign(avg_gpa=lambda x: x['gpa_total'] / x['total_students'])
         .rename(columns={
             'course_prefix': 'Course Prefix',
             'department': 'Department',
@@ -161,31 +251,18 @@ def create_course_scatter_df(df: pd.DataFrame, semesters: list[str]) -> pd.DataF
 
 
 def create_bar_df(df: pd.DataFrame, semesters: list[str]) -> pd.DataFrame:
-    """Create aggregated dataframe for grade distribution bar chart."""
-    # Create an aggregated DF across all semesters
-    bar_df = (
-        df
-        .groupby(['college', 'course_prefix', 'course_number', 'department', 'letter_grade', 'gpa', 'course_display_name'])
-        .agg(total_students=('num_students', 'sum'))
-        .reset_index()
-        .assign(semester='All')
-    )
-
-    # Create the same DF for each semester
-    semester_dfs = [
-        (
-            df
-            .query("semester == @semester")
-            .groupby(['college', 'course_prefix', 'course_number', 'department', 'letter_grade', 'gpa', 'course_display_name'])
-            .agg(total_students=('num_students', 'sum'))
-            .reset_index()
-            .assign(semester=semester)
-        )
-        for semester in semesters
-    ]
+    """
+    Create aggregated dataframe for grade distribution bar chart.
 
+    Only per-semester rows are included; the dashboard sums them for the 'All' semester.
+    """
     bar_df = (
-        pd.concat([bar_df] + semester_dfs)
+        aggregate_by_semester(
+            df,
+            ['college', 'course_prefix', 'course_number', 'department', 'letter_grade', 'gpa', 'course_display_name'],
+            include_all=False,
+            total_students=('num_students', 'sum')
+        )
         .rename(columns={
             'course_prefix': 'Course Prefix',
             'department': 'Department',
@@ -199,36 +276,55 @@ def create_bar_df(df: pd.DataFrame, semesters: list[str]) -> pd.DataFrame:
     return bar_df
 
 
-def prepare_data(data_dir: Path = Path('data')) -> None:
+def prepare_data(data_dir: Path = Path('data'), force: bool = False) -> None:
     """
     Main data preparation pipeline that loads, engineers, and saves all processed datasets.
 
+    Skipped when the raw inputs are unchanged since the last run and all processed datasets exist.
+
     Args:
         data_dir: Path to the data directory containing raw/ and processed/ subdirectories
+        force: Rebuild the processed datasets even if the raw inputs are unchanged
     """
+    processed_dir = data_dir / 'processed'
+    hash_path = processed_dir / '.inputs_hash'
+    inputs_hash = hash_raw_inputs(data_dir)
+
+    if (
+        not force
+        and hash_path.exists()
+        and hash_path.read_text() == inputs_hash
+        and all((processed_dir / name).exists() for name in PROCESSED_FILES)
+    ):
+        print("Raw data unchanged since last run; skipped (cached)")
+        return
+
     print("Loading and engineering data...")
     df, semesters = load_and_engineer_data(data_dir)
-    print(f"Loaded {len(df):,} rows of grade data across {len(semesters)} semesters")
+    print(f"Reduced to {len(df):,} grade groups across {len(semesters)} semesters")
 
     print("\nCreating prefix scatter dataset...")
     prefix_scatter_df = create_prefix_scatter_df(df, semesters)
-    output_path = data_dir / 'processed' / 'prefix_scatter_df.csv'
+    output_path = processed_dir / 'prefix_scatter_df.parquet'
     output_path.parent.mkdir(parents=True, exist_ok=True)
-    prefix_scatter_df.to_csv(output_path, index=False)
+    prefix_scatter_df.to_parquet(output_path, compression='zstd', index=False)
     print(f"Saved to {output_path}")
 
     print("\nCreating course scatter dataset...")
     course_scatter_df = create_course_scatter_df(df, semesters)
-    output_path = data_dir / 'processed' / 'course_scatter_df.csv'
-    course_scatter_df.to_csv(output_path, index=False)
+    output_path = processed_dir / 'course_scatter_df.parquet'
+    course_scatter_df.to_parquet(output_path, compression='zstd', index=False)
     print(f"Saved to {output_path}")
 
     print("\nCreating bar chart dataset...")
     bar_df = create_bar_df(df, semesters)
-    output_path = data_dir / 'processed' / 'bar_df.csv'
-    bar_df.to_csv(output_path, index=False)
+    output_path = processed_dir / 'bar_df_by_semester.parquet'
+    bar_df.to_parquet(output_path, compression='zstd', index=False)
     print(f"Saved to {output_path}")
 
+    # Record the inputs only after every dataset has been written
+    hash_path.write_text(inputs_hash)
+
     print("\nData preparation complete!")
 
 
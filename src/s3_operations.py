@@ -1,10 +1,14 @@
 """Simple S3 operations for uploading and downloading files."""
 
+import functools
 import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
 import boto3
+import pandas as pd
 import requests
+from boto3.s3.transfer import TransferConfig
 from botocore.client import Config
 from dotenv import load_dotenv
 
@@ -17,9 +21,25 @@ RAW_DATA_URLS = [
     'https://pub-2b49819eca18477991a35a5e2ff85330.r2.dev/prefix_to_college.csv'
 ]
 
+# Number of files uploaded concurrently by upload_directory
+UPLOAD_WORKERS = 8
 
+# Multipart settings for uploading large files in concurrent parts
+TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    max_concurrency=8,
+    use_threads=True
+)
+
+
+@functools.lru_cache(maxsize=1)
 def get_s3_client():
-    """Create and return a configured S3 client."""
+    """
+    Create and return a configured S3 client.
+
+    The client is cached and shared across calls (boto3 clients are thread-safe);
+    call get_s3_client.cache_clear() to rebuild it after credentials change.
+    """
     # Get credentials from environment
     access_key_id = os.getenv('S3_ACCESS_KEY_ID')
     secret_access_key = os.getenv('S3_SECRET_ACCESS_KEY')
@@ -37,7 +57,11 @@ def get_s3_client():
     client_kwargs = {
         'aws_access_key_id': access_key_id,
         'aws_secret_access_key': secret_access_key,
-        'config': Config(signature_version='s3v4'),
+        # Enough pooled connections for every upload worker's concurrent parts
+        'config': Config(
+            signature_version='s3v4',
+            max_pool_connections=UPLOAD_WORKERS * TRANSFER_CONFIG.max_concurrency
+        ),
         'region_name': region
     }
 
@@ -45,7 +69,8 @@ def get_s3_client():
     if endpoint_url:
         client_kwargs['endpoint_url'] = endpoint_url
 
-    return boto3.client('s3', **client_kwargs)
+    # Use a dedicated session since the default session is not thread-safe
+    return boto3.session.Session().client('s3', **client_kwargs)
 
 
 def upload_file(local_path: Path | str, bucket: str, key: str) -> None:
@@ -59,7 +84,8 @@ def upload_file(local_path: Path | str, bucket: str, key: str) -> None:
         str(local_path),
         bucket,
         key,
-        ExtraArgs={'ContentType': 'text/csv'} if local_path.suffix == '.csv' else {}
+        ExtraArgs={'ContentType': 'text/csv'} if local_path.suffix == '.csv' else {},
+        Config=TRANSFER_CONFIG
     )
 
     print(f"Uploaded {local_path.name}")
@@ -83,20 +109,30 @@ def upload_directory(
         print(f"No files matching {pattern} found in {directory}")
         return {'total': 0, 'successful': 0, 'failed': 0}
 
+    # Build the cached client before starting workers; lru_cache does not lock, so workers that
+    # miss the cache at the same time would each build their own client
+    get_s3_client()
+
     print(f"\nUploading {len(files)} file(s) to s3://{bucket}/{prefix}")
     print("=" * 60)
 
     successful = 0
     failed = 0
 
-    for file_path in files:
-        key = f"{prefix}{file_path.name}" if prefix else file_path.name
-        try:
-            upload_file(file_path, bucket, key)
-            successful += 1
-        except Exception as e:
-            print(f"✗ Failed to upload {file_path.name}: {e}")
-            failed += 1
+    # Upload files concurrently; each upload_file call also parallelizes its own parts
+    with ThreadPoolExecutor(max_workers=min(UPLOAD_WORKERS, len(files))) as executor:
+        futures = {}
+        for file_path in files:
+            key = f"{prefix}{file_path.name}" if prefix else file_path.name
+            futures[executor.submit(upload_file, file_path, bucket, key)] = file_path
+
+        for future in as_completed(futures):
+            try:
+                future.result()
+                successful += 1
+            except Exception as e:
+                print(f"✗ Failed to upload {futures[future].name}: {e}")
+                failed += 1
 
     print("=" * 60)
     print(f"Upload complete: {successful} successful, {failed} failed\n")
@@ -104,6 +140,24 @@ def upload_directory(
     return {'total': len(files), 'successful': successful, 'failed': failed}
 
 
+def download_file(session: requests.Session, url: str, local_path: Path) -> None:
+    """Stream a file from a public URL to disk, leaving any existing file intact on failure."""
+    print(f"Downloading {local_path.name}...")
+
+    part_path = local_path.with_name(local_path.name + '.part')
+    try:
+        with session.get(url, stream=True) as response:
+            response.raise_for_status()
+            with open(part_path, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    f.write(chunk)
+        os.replace(part_path, local_path)
+    finally:
+        part_path.unlink(missing_ok=True)
+
+    print(f"Downloaded {local_path.name}")
+
+
 def download_raw_data(data_dir: Path = Path('data')) -> None:
     """Download raw data files from public URLs to data/raw directory."""
     raw_dir = data_dir / 'raw'
@@ -114,25 +168,21 @@ def download_raw_data(data_dir: Path = Path('data')) -> None:
     successful = 0
     failed = 0
 
-    for url in RAW_DATA_URLS:
-        # Extract filename from URL
-        filename = url.split('/')[-1]
-        local_path = raw_dir / filename
-
-        try:
-            print(f"Downloading {filename}...")
-
-            response = requests.get(url)
-            response.raise_for_status()
-
-            with open(local_path, 'wb') as f:
-                f.write(response.content)
-
-            print(f"Downloaded {filename}")
-            successful += 1
-        except Exception as e:
-            print(f"✗ Failed to download {filename}: {e}")
-            failed += 1
+    # Download all files concurrently over a shared connection pool
+    with requests.Session() as session, ThreadPoolExecutor(max_workers=len(RAW_DATA_URLS)) as executor:
+        futures = {}
+        for url in RAW_DATA_URLS:
+            # Extract filename from URL
+            filename = url.split('/')[-1]
+            futures[executor.submit(download_file, session, url, raw_dir / filename)] = filename
+
+        for future in as_completed(futures):
+            try:
+                future.result()
+                successful += 1
+            except Exception as e:
+                print(f"✗ Failed to download {futures[future]}: {e}")
+                failed += 1
 
     print("=" * 60)
     print(f"Download complete: {successful} successful, {failed} failed\n")
@@ -145,4 +195,9 @@ def upload_processed_data(data_dir: Path = Path('data')) -> None:
         raise ValueError("S3_BUCKET_NAME environment variable not set")
 
     processed_dir = data_dir / 'processed'
+
+    # The dashboard fetches CSVs from the bucket, so export the Parquet outputs first
+    for parquet_path in processed_dir.glob('*.parquet'):
+        pd.read_parquet(parquet_path).to_csv(parquet_path.with_suffix('.csv'), index=False)
+
     upload_directory(processed_dir, bucket, prefix="", pattern="*.csv")
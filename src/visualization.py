@@ -3,6 +3,7 @@
 from pathlib import Path
 
 import altair as alt
+import numpy as np
 import pandas as pd
 
 # Disable row limit for large datasets
@@ -24,7 +25,7 @@ def create_semester_and_prefix_controls(semesters: list[str], prefix_df: pd.Data
     )
 
     # Prefix dropdown
-    prefixes = sorted(set(prefix_df['Course Prefix'].tolist()))
+    prefixes = np.sort(prefix_df['Course Prefix'].unique()).tolist()
     prefix_dropdown = alt.binding_select(
         options=[None] + prefixes,
         labels=['none'] + prefixes,
@@ -181,7 +182,7 @@ def create_grade_bar_chart(
     # Dynamic course name and GPA labels
     unique_course_names = (
         course_scatter_df
-        .groupby(['Course Name', 'Course Prefix'])
+        .groupby(['Course Name', 'Course Prefix'], observed=True)
         .agg(count=('college', 'count'))
         .reset_index()
     )
@@ -232,7 +233,15 @@ def create_grade_bar_chart(
         )
         .transform_filter(prefix_selection | prefix_dropdown_select)
         .transform_filter(selection_course_name)
-        .transform_filter(semester_select)
+        # bar_df has no 'All' rows, so sum across semesters when 'All' is selected; the selection
+        # stores each field's value as an array, so compare against its first element
+        .transform_filter(
+            (semester_select.semester[0] == 'All') | (alt.datum.semester == semester_select.semester[0])
+        )
+        .transform_aggregate(
+            **{'Total Students': 'sum(Total Students)'},
+            groupby=['Letter Grade', 'Grade Points']
+        )
         .properties(
             title={
                 "text": ["3. View Grade Distribution"],
@@ -253,13 +262,13 @@ def create_dashboard(data_dir: Path = Path('data'), output_dir: Path = Path('out
     Create the interactive dashboard and save as HTML.
 
     Args:
-        data_dir: Path to the data directory containing processed CSV files
+        data_dir: Path to the data directory containing processed Parquet files
         output_dir: Path to save the output HTML file
     """
     print("Loading processed data...")
-    prefix_scatter_df = pd.read_csv(data_dir / 'processed' / 'prefix_scatter_df.csv')
-    course_scatter_df = pd.read_csv(data_dir / 'processed' / 'course_scatter_df.csv')
-    bar_df = pd.read_csv(data_dir / 'processed' / 'bar_df.csv')
+    prefix_scatter_df = pd.read_parquet(data_dir / 'processed' / 'prefix_scatter_df.parquet')
+    course_scatter_df = pd.read_parquet(data_dir / 'processed' / 'course_scatter_df.parquet')
+    bar_df = pd.read_parquet(data_dir / 'processed' / 'bar_df_by_semester.parquet')
 
     # Get list of semesters from prefix scatter data
     semesters = [
@@ -279,7 +288,8 @@ def create_dashboard(data_dir: Path = Path('data'), output_dir: Path = Path('out
     print("Building prefix scatterplot...")
     prefix_scatter_url = 'https://pub-2b49819eca18477991a35a5e2ff85330.r2.dev/prefix_scatter_df.csv'
     course_scatter_url = 'https://pub-2b49819eca18477991a35a5e2ff85330.r2.dev/course_scatter_df.csv'
-    bar_df_url = 'https://pub-2b49819eca18477991a35a5e2ff85330.r2.dev/bar_df.csv'
+    # Published under its own key: bar_df.csv still carries 'All' rows for previously built dashboards
+    bar_df_url = 'https://pub-2b49819eca18477991a35a5e2ff85330.r2.dev/bar_df_by_semester.csv'
 
     prefix_scatter_final, prefix_selection = create_prefix_scatter(
         prefix_scatter_url, semester_select, prefix_dropdown_select